@@ -0,0 +1,28 @@
+import time
+from typing import Optional
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures so callers can fail fast
+    while an upstream is down, then lets calls through again once
+    `reset_after` seconds have passed."""
+
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        return time.monotonic() - self._opened_at >= self.reset_after
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self._opened_at = time.monotonic()
@@ -0,0 +1,21 @@
+import os
+
+from dotenv import load_dotenv
+
+# Production entrypoint: gunicorn -c gunicorn.conf.py main:app
+#
+# Each worker is a uvicorn event loop; with uvloop and httptools installed the
+# worker picks them up automatically. Running more than one worker requires
+# REDIS_URL so session state is shared between workers.
+
+# Read .env here too, since REDIS_URL there decides the worker count before the app loads
+load_dotenv()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+if os.getenv("REDIS_URL"):
+    workers = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1))
+else:
+    # Without Redis each worker would keep its own sessions, so stay on one
+    workers = 1
+keepalive = 75
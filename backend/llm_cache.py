@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import numpy as np
+import orjson
+
+from ttl_cache import TTLCache
+
+LLM_CACHE_MAXSIZE = 4096
+LLM_CACHE_TTL_SECONDS = 3600.0
+SEMANTIC_CACHE_MAXSIZE = 1024
+SEMANTIC_CACHE_THRESHOLD = 0.92
+
+T = TypeVar("T")
+
+
+class SemanticCache:
+    """Nearest-neighbour cache: returns the value stored for the most similar
+    embedding when its cosine similarity clears the threshold. Entries are
+    partitioned, and a lookup only matches entries stored under the same
+    partition."""
+
+    def __init__(self, maxsize: int, threshold: float):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._values: list[Optional[str]] = [None] * maxsize
+        self._partitions = np.zeros(maxsize, dtype=np.int64)
+        self._count = 0
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> Optional[np.ndarray]:
+        norm = np.linalg.norm(embedding)
+        if not norm:
+            return None
+        return embedding / norm
+
+    @staticmethod
+    def _partition_id(partition: str) -> int:
+        return int.from_bytes(hashlib.blake2b(partition.encode(), digest_size=8).digest(), "little", signed=True)
+
+    async def get(self, partition: str, embedding: np.ndarray) -> Optional[str]:
+        query = self._normalize(embedding)
+        async with self._lock:
+            size = min(self._count, self.maxsize)
+            if query is None or not size or query.shape[0] != self._vectors.shape[1]:
+                self.misses += 1
+                return None
+            # Rows are stored unit-length, so the dot product is the cosine similarity
+            scores = self._vectors[:size] @ query
+            scores[self._partitions[:size] != self._partition_id(partition)] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._values[best]
+
+    async def set(self, partition: str, embedding: np.ndarray, value: str) -> None:
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        async with self._lock:
+            if self._vectors is None or vector.shape[0] != self._vectors.shape[1]:
+                self._vectors = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+                self._count = 0
+            # Ring buffer: once full, overwrite the oldest entry
+            slot = self._count % self.maxsize
+            self._vectors[slot] = vector
+            self._values[slot] = value
+            self._partitions[slot] = self._partition_id(partition)
+            self._count += 1
+
+    def stats(self) -> dict:
+        return {
+            "size": min(self._count, self.maxsize),
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key: the first caller starts the
+    work and later callers await the same task instead of repeating it."""
+
+    def __init__(self):
+        self.coalesced = 0
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._waiters: dict[asyncio.Task, int] = {}
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._tasks[key] = task
+            self._waiters[task] = 0
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced += 1
+        self._waiters[task] += 1
+        try:
+            # Shielded so one caller being cancelled does not cancel the others
+            return await asyncio.shield(task)
+        finally:
+            if not task.done():
+                self._waiters[task] -= 1
+                if not self._waiters[task]:
+                    # Every caller gave up, so nobody needs the result
+                    task.cancel()
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        self._waiters.pop(task, None)
+
+    def stats(self) -> dict:
+        return {"inflight": len(self._tasks), "coalesced": self.coalesced}
+
+
+def make_cache_key(model: str, messages: list[dict], temperature: float, max_tokens: int) -> str:
+    canonical = orjson.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+        option=orjson.OPT_SORT_KEYS,
+    )
+    return hashlib.blake2b(canonical, digest_size=32).hexdigest()
+
+
+llm_cache = TTLCache(maxsize=LLM_CACHE_MAXSIZE, ttl=LLM_CACHE_TTL_SECONDS)
+llm_inflight = SingleFlight()
+rephrase_cache = SemanticCache(maxsize=SEMANTIC_CACHE_MAXSIZE, threshold=SEMANTIC_CACHE_THRESHOLD)
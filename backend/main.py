@@ -1,18 +1,84 @@
+import asyncio
 import os
+import random
 import uuid
-import json
 import re
-from typing import Optional
+from contextlib import aclosing, asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
-from pydantic import BaseModel
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, ValidationError
+from pydantic.json_schema import models_json_schema
 import httpx
+import json_repair
+import numpy as np
+import orjson
+from circuit_breaker import CircuitBreaker
+from llm_cache import llm_cache, llm_inflight, make_cache_key, rephrase_cache
+from redis.asyncio import ConnectionPool, Redis
+from session_store import SESSION_TTL_SECONDS as DEFAULT_SESSION_TTL_SECONDS, SessionStore
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from tts_cache import TTS_TRANSIENT_TTL_SECONDS, TTSCache
 
 load_dotenv()
 
-app = FastAPI(title="Interview Simulator API")
+# Connection pool sizing for upstream APIs; HTTP/2 lets concurrent LLM calls share a few sockets
+OPENROUTER_MAX_CONNS = int(os.getenv("OPENROUTER_MAX_CONNS", "1000"))
+OPENROUTER_MAX_KEEPALIVE = int(os.getenv("OPENROUTER_MAX_KEEPALIVE", "100"))
+
+# Shared session store; without it sessions live in process memory and only a single worker is safe
+REDIS_URL = os.getenv("REDIS_URL")
+# Per-worker cap on Redis connections, shared by the session store and TTS cache
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "100"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", DEFAULT_SESSION_TTL_SECONDS))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled clients shared by all requests so LLM/TTS calls reuse warm keep-alive
+    # connections instead of paying a TCP+TLS handshake per call. Both clients sit
+    # on one transport, so OpenRouter and ElevenLabs share a single connection pool.
+    transport = httpx.AsyncHTTPTransport(
+        retries=3,
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=OPENROUTER_MAX_CONNS,
+            max_keepalive_connections=OPENROUTER_MAX_KEEPALIVE,
+        ),
+    )
+    # A short connect timeout surfaces an unreachable upstream quickly instead of
+    # holding the request for the full read timeout
+    app.state.openrouter_client = httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(60.0, connect=10.0))
+    app.state.elevenlabs_client = httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(30.0, connect=10.0))
+    redis = None
+    if REDIS_URL:
+        # The client owns the pool, so closing it below also disconnects the pool
+        redis = Redis.from_pool(ConnectionPool.from_url(REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS))
+    app.state.sessions = SessionStore(redis, ttl=SESSION_TTL_SECONDS)
+    app.state.tts_cache = TTSCache(redis)
+    prewarm = None
+    if ELEVENLABS_API_KEY and redis is not None:
+        # Synthesize the fixed phrases in the background so startup is not blocked.
+        # Only worth it when the clips land in Redis: an in-process copy would be
+        # re-billed by every worker on every restart.
+        prewarm = asyncio.create_task(prewarm_tts(app.state.elevenlabs_client, app.state.tts_cache))
+    try:
+        yield
+    finally:
+        if prewarm is not None:
+            prewarm.cancel()
+        await app.state.openrouter_client.aclose()
+        await app.state.elevenlabs_client.aclose()
+        await transport.aclose()
+        if redis is not None:
+            await redis.aclose()
+
+
+app = FastAPI(title="Interview Simulator API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,15 +98,29 @@ app.add_middleware(
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 # Cheaper model for interview questions/responses
 OPENROUTER_MODEL_FAST = os.getenv("OPENROUTER_MODEL_FAST", "openai/gpt-5-mini")
+# The default fast model reasons before answering, and reasoning tokens count
+# against max_tokens; keep its reasoning short so the caps leave room for the reply
+OPENROUTER_FAST_REASONING_EFFORT = os.getenv("OPENROUTER_FAST_REASONING_EFFORT", "minimal")
 # Higher quality model for final report analysis
 OPENROUTER_MODEL_REPORT = os.getenv("OPENROUTER_MODEL_REPORT", "anthropic/claude-3.5-sonnet")
+# Small model that condenses older turns into a rolling summary
+OPENROUTER_MODEL_SUMMARY = os.getenv("OPENROUTER_MODEL_SUMMARY", "anthropic/claude-3-haiku")
 OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+# Embedding model for the semantic rephrase cache
+OPENROUTER_EMBEDDING_MODEL = os.getenv("OPENROUTER_EMBEDDING_MODEL", "openai/text-embedding-3-small")
+OPENROUTER_EMBEDDINGS_URL = "https://openrouter.ai/api/v1/embeddings"
+# The rephrase cache lookup is only worth it if it is much faster than the LLM call it saves
+OPENROUTER_EMBEDDING_TIMEOUT_SECONDS = 1.5
+# Cap on in-flight OpenRouter calls per worker
+OPENROUTER_MAX_CONCURRENCY = int(os.getenv("OPENROUTER_MAX_CONCURRENCY", "64"))
+
+llm_semaphore = asyncio.Semaphore(OPENROUTER_MAX_CONCURRENCY)
+# Fail fast for 30s after 5 consecutive calls exhaust their retries
+llm_breaker = CircuitBreaker(threshold=5, reset_after=30.0)
 
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
 
-sessions: dict = {}
-
 
 class SessionStartRequest(BaseModel):
     name: str
@@ -57,6 +137,9 @@ class SessionStartResponse(BaseModel):
 
 
 class TurnItem(BaseModel):
+    # Turns are history and never modified after parsing
+    model_config = ConfigDict(frozen=True)
+
     type: str
     aiText: str
     userTranscript: str
@@ -88,7 +171,7 @@ class TurnNextResponse(BaseModel):
     aiText: str
     mainQuestionIndex: int
     followupCount: int  # 0, 1, or 2 - number of follow-ups asked for current main question
-    internalEval: InternalEval
+    internalEval: Optional[InternalEval] = None  # Per-turn evaluation is disabled; see turn_next
 
 
 class ReportFinalRequest(BaseModel):
@@ -117,129 +200,784 @@ class TTSRequest(BaseModel):
     voice_id: Optional[str] = None
 
 
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def json_body(model: type[ModelT]) -> Callable[[Request], Awaitable[ModelT]]:
+    # Validates the raw body bytes in a single pydantic-core pass instead of
+    # FastAPI's json.loads-then-validate, which matters for long turn lists
+    async def parse(request: Request) -> ModelT:
+        try:
+            return model.model_validate_json(await request.body())
+        except ValidationError as exc:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in exc.errors(include_url=False)]
+            )
+    return parse
+
+
+# Models read through json_body. FastAPI cannot see a body behind a plain Request
+# dependency, so their schemas are published to the OpenAPI document by hand.
+JSON_BODY_MODELS = (TurnNextRequest, ReportFinalRequest)
+
+
+def json_body_openapi(model: type[BaseModel]) -> dict:
+    schema = {"$ref": f"#/components/schemas/{model.__name__}"}
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": schema}}}}
+
+
+def openapi() -> dict:
+    if app.openapi_schema is None:
+        schema = FastAPI.openapi(app)
+        _, definitions = models_json_schema(
+            [(model, "validation") for model in JSON_BODY_MODELS],
+            ref_template="#/components/schemas/{model}",
+        )
+        schema.setdefault("components", {}).setdefault("schemas", {}).update(definitions["$defs"])
+    return app.openapi_schema
+
+
+app.openapi = openapi
+
+
+def get_openrouter_client(request: Request) -> httpx.AsyncClient:
+    return request.app.state.openrouter_client
+
+
+def get_elevenlabs_client(request: Request) -> httpx.AsyncClient:
+    return request.app.state.elevenlabs_client
+
+
+def get_session_store(request: Request) -> SessionStore:
+    return request.app.state.sessions
+
+
+def get_tts_cache(request: Request) -> TTSCache:
+    return request.app.state.tts_cache
+
+
+JUNIOR_KEYWORDS = frozenset({"intern", "co-op", "junior", "entry"})
+LEADERSHIP_KEYWORDS = frozenset({"manager", "lead", "director", "senior", "principal", "staff"})
+
+
+def keyword_prefix_regex(keywords: frozenset[str]) -> re.Pattern:
+    # Keywords anchored at the start of a word, so "Team Leader" and "Internship"
+    # still match while mid-word hits such as "Misleading" do not
+    return re.compile(r"\b(?:" + "|".join(map(re.escape, sorted(keywords))) + ")", re.IGNORECASE)
+
+
+_JUNIOR_RE = keyword_prefix_regex(JUNIOR_KEYWORDS)
+_LEADERSHIP_RE = keyword_prefix_regex(LEADERSHIP_KEYWORDS)
+
+
 def infer_role_bucket(role_title: str) -> str:
-    title_lower = role_title.lower()
-    if any(word in title_lower for word in ["intern", "co-op", "junior", "entry"]):
+    if _JUNIOR_RE.search(role_title):
         return "JUNIOR"
-    if any(word in title_lower for word in ["manager", "lead", "director", "senior", "principal", "staff"]):
+    if _LEADERSHIP_RE.search(role_title):
         return "LEADERSHIP"
     return "MID"
 
 
-async def call_llm(messages: list[dict], model: Optional[str] = None, retry: bool = True) -> str:
-    if not OPENROUTER_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENROUTER_API_KEY not configured")
+# The only characters that can change the scanner's state
+_JSON_STRUCTURAL_RE = re.compile(r'[{}"\\]')
+
+
+class JSONObjectScanner:
+    """Incrementally locates the first complete top-level JSON object in text fed
+    chunk by chunk, tracking brace depth while skipping string literals."""
+
+    def __init__(self):
+        self.start = -1
+        self.end = -1
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped_pos = -1
+
+    def feed(self, chunk: str) -> bool:
+        """Consume the next chunk; returns True once the object has closed."""
+        if self.end >= 0:
+            return True
+        base = self._pos
+        self._pos += len(chunk)
+        # Jump between structural characters so runs of ordinary text are
+        # skipped by the regex engine instead of a per-character Python loop
+        for match in _JSON_STRUCTURAL_RE.finditer(chunk):
+            pos = base + match.start()
+            if pos == self._escaped_pos:
+                continue
+            char = match.group()
+            if self._in_string:
+                if char == "\\":
+                    self._escaped_pos = pos + 1
+                elif char == '"':
+                    self._in_string = False
+            elif char == "{":
+                if self._depth == 0:
+                    self.start = pos
+                self._depth += 1
+            elif self._depth == 0:
+                # Prose around the object, including stray quotes, is ignored
+                continue
+            elif char == '"':
+                self._in_string = True
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = pos + 1
+                    return True
+        return False
+
+
+def with_prompt_cache(messages: list[dict], model: str) -> list[dict]:
+    # Anthropic only caches prompt prefixes that are explicitly marked, so tag the
+    # static system block; other providers cache shared prefixes automatically
+    if not model.startswith("anthropic/"):
+        return messages
+    return [
+        {
+            "role": "system",
+            "content": [{"type": "text", "text": m["content"], "cache_control": {"type": "ephemeral"}}],
+        }
+        if m["role"] == "system" and isinstance(m["content"], str)
+        else m
+        for m in messages
+    ]
 
-    # Default to fast model if not specified
-    if model is None:
-        model = OPENROUTER_MODEL_FAST
 
+async def stream_llm(
+    messages: list[dict],
+    client: httpx.AsyncClient,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+) -> AsyncIterator[str]:
     headers = {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
         "Content-Type": "application/json",
     }
     payload = {
         "model": model,
-        "messages": messages,
-        "temperature": 0.7,
+        "messages": with_prompt_cache(messages, model),
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "stream": True,
     }
+    if model == OPENROUTER_MODEL_FAST and OPENROUTER_FAST_REASONING_EFFORT:
+        payload["reasoning"] = {"effort": OPENROUTER_FAST_REASONING_EFFORT}
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(OPENROUTER_URL, headers=headers, json=payload)
+    # Serialize with orjson rather than letting httpx run stdlib json over the
+    # full message history on every call
+    async with client.stream("POST", OPENROUTER_URL, headers=headers, content=orjson.dumps(payload)) as response:
         if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail=f"LLM error: {response.text}")
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
+            await response.aread()
+            raise httpx.HTTPStatusError(
+                f"LLM error: {response.text}", request=response.request, response=response
+            )
+        async for line in response.aiter_lines():
+            # Server-sent events: skip blank separators and ": keep-alive" comments
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                return
+            chunk = orjson.loads(data)
+            if "error" in chunk:
+                raise HTTPException(status_code=502, detail=f"LLM error: {chunk['error']}")
+            choices = chunk.get("choices")
+            if choices:
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+                if choices[0].get("finish_reason") == "length":
+                    # Cut off at max_tokens (possibly with the whole budget spent on
+                    # reasoning). A partial reply must not be repaired into something
+                    # that looks complete, so fail instead. Callers that stop at a
+                    # closed JSON object never get here for a finished reply.
+                    raise HTTPException(status_code=502, detail="LLM hit max_tokens before finishing its reply")
+
+
+def is_retryable_llm_error(exc: BaseException) -> bool:
+    # Rate limits, upstream 5xx and network failures are transient; other 4xx are not
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+async def call_llm(
+    messages: list[dict],
+    client: httpx.AsyncClient,
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 512,
+    stop_at_json: bool = False,
+    retry: bool = True,
+) -> str:
+    if not OPENROUTER_API_KEY:
+        raise HTTPException(status_code=500, detail="OPENROUTER_API_KEY not configured")
+
+    # Default to fast model if not specified
+    if model is None:
+        model = OPENROUTER_MODEL_FAST
 
+    # Identical deterministic prompts skip the round trip entirely. Sampled output
+    # is never cached, so candidates (or a candidate practicing again) still get
+    # varied questions.
+    if temperature != 0:
+        return await fetch_llm(messages, client, model, temperature, max_tokens, stop_at_json, None)
+
+    cache_key = make_cache_key(model, messages, temperature, max_tokens)
+    cached = await llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Identical prompts already in flight (concurrent sessions with the same role)
+    # share that call instead of starting their own. Like the cache this is limited
+    # to deterministic calls, since sharing a sampled reply would hand two
+    # candidates the same question.
+    return await llm_inflight.run(
+        cache_key, lambda: fetch_llm(messages, client, model, temperature, max_tokens, stop_at_json, cache_key)
+    )
 
-def extract_json(text: str) -> dict:
-    json_match = re.search(r'\{[\s\S]*\}', text)
-    if json_match:
-        return json.loads(json_match.group())
-    raise ValueError("No JSON found in response")
+
+async def fetch_llm(
+    messages: list[dict],
+    client: httpx.AsyncClient,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    stop_at_json: bool,
+    cache_key: Optional[str],
+) -> str:
+    if not llm_breaker.allow():
+        raise HTTPException(status_code=503, detail="LLM provider unavailable, please try again shortly")
+
+    async def complete() -> str:
+        scanner = JSONObjectScanner() if stop_at_json else None
+        parts = []
+        async with llm_semaphore:
+            async with aclosing(stream_llm(messages, client, model, temperature, max_tokens)) as deltas:
+                async for delta in deltas:
+                    parts.append(delta)
+                    # Once the JSON object closes, stop reading; closing the stream
+                    # also stops the provider generating (and billing) trailing tokens
+                    if scanner is not None and scanner.feed(delta):
+                        break
+        return "".join(parts)
+
+    try:
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(4),
+            wait=wait_exponential_jitter(initial=1, max=8),
+            retry=retry_if_exception(is_retryable_llm_error),
+            reraise=True,
+        ):
+            with attempt:
+                content = await complete()
+    except httpx.HTTPStatusError as exc:
+        if is_retryable_llm_error(exc):
+            llm_breaker.record_failure()
+        raise HTTPException(status_code=exc.response.status_code, detail=str(exc))
+    except httpx.TransportError as exc:
+        llm_breaker.record_failure()
+        raise HTTPException(status_code=502, detail=f"LLM error: {exc!r}")
+    llm_breaker.record_success()
+
+    # An empty reply is a failure, not an answer worth replaying
+    if cache_key is not None and content.strip():
+        await llm_cache.set(cache_key, content)
+    return content
+
+
+async def embed_text(text: str, client: httpx.AsyncClient) -> Optional[np.ndarray]:
+    # Best effort: callers fall back to the uncached path when embeddings are unavailable
+    if not OPENROUTER_API_KEY:
+        return None
+    try:
+        # Bounded end to end, not just per socket operation, so a slow endpoint
+        # cannot hold up the rephrase path
+        response = await asyncio.wait_for(
+            client.post(
+                OPENROUTER_EMBEDDINGS_URL,
+                headers={
+                    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+                    "Content-Type": "application/json",
+                },
+                content=orjson.dumps({"model": OPENROUTER_EMBEDDING_MODEL, "input": text}),
+                timeout=OPENROUTER_EMBEDDING_TIMEOUT_SECONDS,
+            ),
+            OPENROUTER_EMBEDDING_TIMEOUT_SECONDS,
+        )
+    except (httpx.HTTPError, asyncio.TimeoutError):
+        return None
+    if response.status_code != 200:
+        return None
+    try:
+        return np.asarray(response.json()["data"][0]["embedding"], dtype=np.float32)
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
 
 
-async def call_llm_json(messages: list[dict], model: Optional[str] = None, retry: bool = True) -> dict:
-    text = await call_llm(messages, model=model)
+def extract_json(text: str) -> dict:
+    scanner = JSONObjectScanner()
+    closed = scanner.feed(text)
+    if scanner.start < 0:
+        raise ValueError("No JSON found in response")
+    if not closed:
+        # An unclosed object is an incomplete reply; let the caller ask again
+        raise ValueError("Unterminated JSON object in response")
+    candidate = text[scanner.start:scanner.end]
+    try:
+        return orjson.loads(candidate)
+    except orjson.JSONDecodeError:
+        pass
+    # Trailing commas, single quotes and the like are repaired locally, which is
+    # far cheaper than asking the model again
+    repaired = json_repair.loads(candidate)
+    if isinstance(repaired, dict) and repaired:
+        return repaired
+    raise ValueError("Could not parse JSON in response")
+
+
+async def call_llm_json(
+    messages: list[dict],
+    client: httpx.AsyncClient,
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 512,
+    retry: bool = True,
+) -> dict:
+    text = await call_llm(
+        messages, client, model=model, temperature=temperature, max_tokens=max_tokens, stop_at_json=True
+    )
     try:
         return extract_json(text)
-    except (json.JSONDecodeError, ValueError):
+    except (orjson.JSONDecodeError, ValueError):
         if retry:
             messages.append({"role": "assistant", "content": text})
             messages.append({"role": "user", "content": "Please respond with valid JSON only."})
-            text = await call_llm(messages, model=model, retry=False)
-            return extract_json(text)
+            text = await call_llm(
+                messages,
+                client,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stop_at_json=True,
+                retry=False,
+            )
+            try:
+                return extract_json(text)
+            except (orjson.JSONDecodeError, ValueError):
+                pass
         raise HTTPException(status_code=500, detail="Failed to parse LLM JSON response")
 
 
+PERSONAS = {
+    "CALM": "You are a warm, encouraging interviewer who puts candidates at ease. Ask questions in a friendly, conversational tone.",
+    "STRICT": "You are a professional, no-nonsense interviewer. Be direct and formal, but fair. Expect concise, well-structured answers.",
+    "AGGRESSIVE": "You are a challenging interviewer who tests candidates under pressure. Be direct, occasionally interrupt with probing follow-ups, and maintain high expectations."
+}
+
+
+# Closing statements are boilerplate, so they are templated rather than generated
+CLOSINGS = {
+    "CALM": [
+        "Thank you so much for your time today. I really enjoyed hearing about your experiences. We'll be in touch soon.",
+        "That brings us to the end of the interview. Thanks for sharing your stories with me, it was a pleasure talking with you.",
+        "Thanks again for taking the time to chat today. You've given me a great picture of your experience. We'll follow up with next steps soon.",
+    ],
+    "STRICT": [
+        "That concludes the interview. Thank you for your time. We will be in touch regarding next steps.",
+        "Thank you, that is all the questions I have for today. We will follow up with you shortly.",
+        "We are out of time. Thank you for your answers today. You will hear from us about next steps.",
+    ],
+    "AGGRESSIVE": [
+        "That's all we have time for. Thanks for holding up under the pressure. We'll be in touch.",
+        "Alright, we'll stop there. Thank you for your time today. Expect to hear from us soon.",
+        "That wraps it up. Thanks for sticking with those tough questions. We'll let you know about next steps.",
+    ],
+}
+
+
 def get_intensity_persona(intensity: str) -> str:
-    personas = {
-        "CALM": "You are a warm, encouraging interviewer who puts candidates at ease. Ask questions in a friendly, conversational tone.",
-        "STRICT": "You are a professional, no-nonsense interviewer. Be direct and formal, but fair. Expect concise, well-structured answers.",
-        "AGGRESSIVE": "You are a challenging interviewer who tests candidates under pressure. Be direct, occasionally interrupt with probing follow-ups, and maintain high expectations."
-    }
-    return personas.get(intensity, personas["CALM"])
+    return PERSONAS.get(intensity, PERSONAS["CALM"])
 
 
-def is_repeat_request(user_transcript: str) -> bool:
-    """Check if the user is asking to repeat or rephrase the question."""
-    transcript_lower = user_transcript.lower().strip()
+INTERVIEWER_SYSTEM_TEMPLATE = """You are conducting a behavioral interview for a {role_title} position.
+{persona}
+
+Role description: {role_desc}"""
+
+
+@lru_cache(maxsize=256)
+def interviewer_system_prompt(intensity: str, role_title: str, role_desc: str) -> str:
+    # Invariant per session, so every turn sends a byte-identical first message
+    # that providers can serve from their prefix cache
+    return INTERVIEWER_SYSTEM_TEMPLATE.format(
+        role_title=role_title,
+        persona=get_intensity_persona(intensity),
+        role_desc=role_desc,
+    )
 
-    repeat_phrases = [
-        "repeat", "say that again", "again please", "one more time",
-        "rephrase", "can you rephrase", "could you rephrase",
-        "didn't catch", "didn't hear", "didn't understand",
-        "what was the question", "what's the question", "what is the question",
-        "sorry what", "pardon", "excuse me",
-        "can you repeat", "could you repeat", "please repeat",
-        "say again", "come again", "i'm sorry",
-        "didn't get that", "missed that", "what did you say",
-        "can you clarify", "could you clarify"
+
+def interviewer_messages(req: SessionStartRequest | TurnNextRequest, instruction: str) -> list[dict]:
+    return [
+        {"role": "system", "content": interviewer_system_prompt(req.intensity, req.roleTitle, req.roleDesc)},
+        {"role": "user", "content": instruction},
     ]
 
-    # Check if the response is short (likely just a request to repeat)
-    # and contains repeat-related phrases
-    is_short = len(transcript_lower.split()) <= 15
-    contains_repeat_phrase = any(phrase in transcript_lower for phrase in repeat_phrases)
 
-    return is_short and contains_repeat_phrase
+REPEAT_PHRASES = [
+    "repeat", "say that again", "again please", "one more time",
+    "rephrase", "can you rephrase", "could you rephrase",
+    "didn't catch", "didn't hear", "didn't understand",
+    "what was the question", "what's the question", "what is the question",
+    "sorry what", "pardon", "excuse me",
+    "can you repeat", "could you repeat", "please repeat",
+    "say again", "come again", "i'm sorry",
+    "didn't get that", "missed that", "what did you say",
+    "can you clarify", "could you clarify"
+]
 
+# Single alternation compiled once, so a transcript is scanned in one pass
+# rather than once per phrase
+_REPEAT_RE = re.compile("|".join(map(re.escape, REPEAT_PHRASES)))
 
-@app.post("/session/start", response_model=SessionStartResponse)
-async def session_start(req: SessionStartRequest):
-    session_id = str(uuid.uuid4())
-    role_bucket = infer_role_bucket(req.roleTitle)
 
-    persona = get_intensity_persona(req.intensity)
+# Upper bound on the transcript pasted into per-turn prompts; the final report still sees everything
+HISTORY_MAX_CHARS = 6000
+# Turns kept verbatim in per-turn prompts (a main question and two follow-ups);
+# anything older is replaced by the session's rolling summary
+HISTORY_RECENT_TURNS = 6
+# Summarize in batches so a summary call is not made on every turn
+HISTORY_SUMMARY_BATCH = 4
 
-    prompt = f"""You are conducting a behavioral interview for a {req.roleTitle} position.
-{persona}
+TRANSCRIPT_LABELS = {"ai": "Interviewer: ", "user": "Candidate: "}
+
+
+def format_turn(turn: TurnItem) -> str:
+    text = turn.aiText if turn.type == "ai" else turn.userTranscript
+    return TRANSCRIPT_LABELS.get(turn.type, "Candidate: ") + text
 
-Role description: {req.roleDesc}
-Candidate name: {req.name}
-Experience level: {role_bucket}
 
-Generate a JSON response with:
-1. "greeting" - A brief, natural greeting to start the interview (1-2 sentences welcoming them)
-2. "firstQuestion" - The first behavioral interview question appropriate for this role and level
+async def conversation_transcript(sessions: SessionStore, session_id: str, turns: list[TurnItem]) -> str:
+    # The session keeps the transcript rendered so far, so each turn only
+    # formats the turns added since the previous request
+    session = await sessions.get(session_id)
+    if session is None:
+        return "\n".join(format_turn(t) for t in turns)
+
+    transcript = session.get("transcript", "")
+    rendered = session.get("transcriptTurns", 0)
+    if rendered > len(turns):
+        # Client history no longer matches what we rendered; start over
+        transcript, rendered = "", 0
+    if rendered == len(turns):
+        return transcript
+
+    new_lines = "\n".join(format_turn(t) for t in turns[rendered:])
+    transcript = f"{transcript}\n{new_lines}" if transcript else new_lines
+    await sessions.set(session_id, {**session, "transcript": transcript, "transcriptTurns": len(turns)})
+    return transcript
+
+
+def truncate_history(history: str, max_chars: int = HISTORY_MAX_CHARS) -> str:
+    # Keep the most recent lines that fit, cutting on a line boundary
+    if len(history) <= max_chars:
+        return history
+    cut = history.find("\n", len(history) - max_chars)
+    return history[cut + 1:] if cut >= 0 else history[-max_chars:]
+
+
+def discard_task(task: asyncio.Task) -> None:
+    # Cancel a speculative call whose result is no longer needed; retrieving the
+    # exception keeps asyncio from logging failures nobody is waiting on
+    task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+# Strong references to fire-and-forget tasks so they are not garbage collected mid-flight
+_background_tasks: set[asyncio.Task] = set()
+
+
+def run_in_background(coro: Awaitable) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def keep_pending_next_question(
+    sessions: SessionStore, session_id: str, main_question_index: int, task: asyncio.Task
+) -> None:
+    # A speculative next question that lost out to a follow-up is still valid for
+    # the turn that eventually moves on, so park it in the session for reuse
+    try:
+        result = await task
+    except Exception:
+        return
+    session = await sessions.get(session_id)
+    if session is None or not result.get("aiText"):
+        return
+    pending = {"mainQuestionIndex": main_question_index, "aiText": result["aiText"]}
+    await sessions.set(session_id, {**session, "pendingNextQuestion": pending})
+
+
+NAME_PLACEHOLDER = "[NAME]"
+# Models do not always echo the placeholder exactly: accept [Name], {NAME},
+# {{name}}, <candidate name> and similar
+_NAME_PLACEHOLDER_RE = re.compile(r"[\[{<]{1,2}\s*(?:candidate(?:'s)?[\s_]*)?name\s*[\]}>]{1,2}", re.IGNORECASE)
+# Any other bracketed token left over would be read aloud as-is
+_LEFTOVER_PLACEHOLDER_RE = re.compile(r"[\[{<][^\]}>]*[\]}>]")
+
+
+def fill_name_placeholder(greeting: str, name: str) -> Optional[str]:
+    if _LEFTOVER_PLACEHOLDER_RE.search(_NAME_PLACEHOLDER_RE.sub("", greeting)):
+        return None
+    return _NAME_PLACEHOLDER_RE.sub(lambda _: name, greeting)
+
+# Per-request instruction prompts; the static text is built once at import and
+# only the dynamic fields are filled in per call
+GREETING_TEMPLATE = """Experience level: {role_bucket}
+
+Generate a brief, natural greeting to start the interview (1-2 sentences welcoming them). Address the candidate by name using the exact placeholder {name_placeholder}. Do NOT ask any interview question yet.
+
+Respond ONLY with valid JSON in this format:
+{{"greeting": "..."}}"""
+
+FIRST_QUESTION_TEMPLATE = """Experience level: {role_bucket}
+
+Generate the first behavioral interview question appropriate for this role and level.
 
 IMPORTANT: Do NOT include any instructions or hints on how to answer the question. Just ask the question directly without telling the candidate to use STAR format, provide specific examples, or any other answering guidance. Let the candidate answer naturally.
 
 Respond ONLY with valid JSON in this format:
-{{"greeting": "...", "firstQuestion": "..."}}"""
+{{"firstQuestion": "..."}}"""
 
-    messages = [{"role": "user", "content": prompt}]
-    # Use Claude for the greeting/intro for better quality first impression
-    result = await call_llm_json(messages, model=OPENROUTER_MODEL_REPORT)
+FIRST_TRANSITION_TEMPLATE = """Previous conversation:
+{history}
+
+The candidate just responded to your greeting. Now ask the first main behavioral question.
+
+IMPORTANT: Do NOT include any instructions or hints on how to answer the question. Just ask the question directly without telling the candidate to use STAR format, provide specific examples, or any other answering guidance.
+
+Generate a JSON response:
+{{"aiText": "your response transitioning to the first question", "action": "NEXT_MAIN"}}
+
+Stay in character. Do NOT give feedback on their greeting. Just naturally transition to asking the first behavioral question.
+Respond ONLY with valid JSON."""
+
+REPHRASE_TEMPLATE = """The candidate asked you to repeat or rephrase the question. The original question was:
+"{question}"
+
+Rephrase the question in a slightly different way to help the candidate understand. Keep the same intent but use different wording.
+
+IMPORTANT: Do NOT include any instructions or hints on how to answer the question.
+
+Respond ONLY with valid JSON:
+{{"aiText": "your rephrased question"}}"""
+
+FOLLOWUP_DECISION_TEMPLATE = """Conversation so far:
+{history}
+
+The candidate just answered: {answer}
 
-    sessions[session_id] = {
+Decide: should you ask a follow-up to dig deeper, or move to the next main question?
+- If the answer was vague, incomplete, or you want more specific details/examples, ask a follow-up
+- If the answer was sufficiently complete and detailed, move to the next main behavioral question
+- You can ask up to 2 follow-ups per main question if needed to get a complete picture
+
+IMPORTANT: Do NOT include any instructions or hints on how to answer the question. Just ask the question directly without telling the candidate to use STAR format, provide specific examples, or any other answering guidance.
+
+Respond ONLY with valid JSON:
+{{"action": "ASK_FOLLOWUP" or "NEXT_MAIN", "aiText": "your follow-up question, or an empty string if moving on"}}
+
+Stay in character. Do NOT give feedback. Just ask questions naturally."""
+
+ANOTHER_FOLLOWUP_DECISION_TEMPLATE = """Conversation so far:
+{history}
+
+The candidate just answered your follow-up question: {answer}
+
+Decide: do you need one more follow-up to get complete information, or is the answer now sufficient to move on?
+- If you still need more detail or clarity, ask ONE more follow-up
+- If the answer is now complete enough, move to the next main question
+
+IMPORTANT: Do NOT include any instructions or hints on how to answer the question.
+
+Respond ONLY with valid JSON:
+{{"action": "ASK_FOLLOWUP" or "NEXT_MAIN", "aiText": "your follow-up question, or an empty string if moving on"}}
+
+Stay in character. Do NOT give feedback."""
+
+NEXT_QUESTION_TEMPLATE = """Conversation so far:
+{history}
+
+Generate the next main behavioral question (question #{question_number} of 3).
+Make it relevant to the role and different from previous questions.
+
+IMPORTANT: Do NOT include any instructions or hints on how to answer the question. Just ask the question directly without telling the candidate to use STAR format, provide specific examples, or any other answering guidance.
+
+Respond ONLY with valid JSON:
+{{"action": "NEXT_MAIN", "aiText": "natural transition + your next behavioral question"}}
+
+Stay in character. Do NOT give feedback."""
+
+SUMMARY_TEMPLATE = """Condense this part of a behavioral interview into brief notes for the interviewer, in at most 6 sentences. List every question the interviewer asked and the key points of each answer.
+
+{previous}New conversation:
+{conversation}
+
+Respond with the notes only."""
+
+REPORT_TEMPLATE = """Analyze this complete behavioral interview and generate a detailed report.
+
+Candidate: {name}
+Role: {role_title}
+Role Description: {role_desc}
+Experience Level: {role_bucket}
+Interview Intensity: {intensity}{repeat_info}
+
+Full Interview Transcript:
+{conversation}
+
+Generate a comprehensive JSON report:
+{{
+  "overallScore": 1-100,
+  "subscores": {{
+    "communication": 1-100,
+    "relevance": 1-100,
+    "structure": 1-100,
+    "specificity": 1-100,
+    "confidence": 1-100
+  }},
+  "strengths": ["strength 1", "strength 2", "strength 3"],
+  "improvements": ["area 1", "area 2", "area 3"],
+  "patternUnderPressure": "A paragraph describing how the candidate performed under pressure, their tendencies, and behavioral patterns observed",
+  "idealAnswerRewrite": "Take the weakest answer and rewrite it as an ideal STAR-formatted response",
+  "nextSteps": ["specific action item 1", "specific action item 2", "specific action item 3"]
+}}
+
+Be specific and constructive. Reference actual content from their answers.
+Respond ONLY with valid JSON."""
+
+
+async def update_summary(
+    sessions: SessionStore, session_id: str, turns: list[TurnItem], client: httpx.AsyncClient
+) -> None:
+    # Best effort: until a summary lands, prompts fall back to the truncated transcript
+    session = await sessions.get(session_id)
+    if session is None:
+        return
+    covered = seen = session.get("summaryTurns", 0)
+    previous = session.get("summary", "")
+    if covered > len(turns):
+        # Client history no longer matches what was summarized; start over
+        covered, previous = 0, ""
+    prompt = SUMMARY_TEMPLATE.format(
+        previous=f"Summary so far: {previous}\n\n" if previous else "",
+        conversation="\n".join(format_turn(t) for t in turns[covered:]),
+    )
+    try:
+        summary = await call_llm(
+            [{"role": "user", "content": prompt}],
+            client,
+            model=OPENROUTER_MODEL_SUMMARY,
+            temperature=0.2,
+            max_tokens=256,
+        )
+    except Exception:
+        return
+    session = await sessions.get(session_id)
+    # Skip if another update landed while this one was in flight
+    if session is None or session.get("summaryTurns", 0) != seen or not summary.strip():
+        return
+    await sessions.set(session_id, {**session, "summary": summary.strip(), "summaryTurns": len(turns)})
+
+
+async def prompt_history(
+    sessions: SessionStore, session_id: str, turns: list[TurnItem], client: httpx.AsyncClient
+) -> str:
+    # Per-turn prompts see a rolling summary of older turns plus the most recent
+    # turns verbatim, so prompt size stays flat instead of growing every turn.
+    # The full transcript is still kept for the final report.
+    transcript = await conversation_transcript(sessions, session_id, turns)
+    session = await sessions.get(session_id)
+    if session is None:
+        return truncate_history(transcript)
+
+    covered = session.get("summaryTurns", 0)
+    if covered > len(turns):
+        # Client history no longer matches what was summarized
+        covered = 0
+    if len(turns) - covered >= HISTORY_RECENT_TURNS + HISTORY_SUMMARY_BATCH:
+        # Ready for the next turn; this one uses the summary as it stands
+        run_in_background(update_summary(sessions, session_id, turns[:-HISTORY_RECENT_TURNS], client))
+    if not covered:
+        return truncate_history(transcript)
+    recent = "\n".join(format_turn(t) for t in turns[covered:])
+    return truncate_history(f"Summary of the earlier interview: {session['summary']}\n{recent}")
+
+
+def next_question_prompt(req: TurnNextRequest, conversation_history: str) -> str:
+    return NEXT_QUESTION_TEMPLATE.format(
+        history=conversation_history,
+        question_number=req.mainQuestionIndex + 2,
+    )
+
+
+def is_repeat_request(user_transcript: str) -> bool:
+    """Check if the user is asking to repeat or rephrase the question."""
+    transcript_lower = user_transcript.lower().strip()
+
+    # Check if the response is short (likely just a request to repeat)
+    # and contains repeat-related phrases
+    is_short = len(transcript_lower.split()) <= 15
+    contains_repeat_phrase = _REPEAT_RE.search(transcript_lower) is not None
+
+    return is_short and contains_repeat_phrase
+
+
+@app.post("/session/start", response_model=SessionStartResponse)
+async def session_start(
+    req: SessionStartRequest,
+    client: httpx.AsyncClient = Depends(get_openrouter_client),
+    sessions: SessionStore = Depends(get_session_store),
+):
+    session_id = str(uuid.uuid4())
+    role_bucket = infer_role_bucket(req.roleTitle)
+
+    # The candidate's name is left out of the prompt and filled in afterwards, so
+    # the cached greeting is shared by everyone with the same role and intensity
+    greeting_prompt = GREETING_TEMPLATE.format(role_bucket=role_bucket, name_placeholder=NAME_PLACEHOLDER)
+    first_question_prompt = FIRST_QUESTION_TEMPLATE.format(role_bucket=role_bucket)
+
+    # Both prompts open with the same system prefix as every later turn.
+    # Use Claude for the greeting/intro for better quality first impression.
+    # Greeting and first question are independent, so generate them concurrently.
+    # The greeting is deterministic so repeated role/intensity combinations are served from cache.
+    greeting, first_question = await asyncio.gather(
+        call_llm_json(
+            interviewer_messages(req, greeting_prompt), client, model=OPENROUTER_MODEL_REPORT, temperature=0, max_tokens=128
+        ),
+        call_llm_json(interviewer_messages(req, first_question_prompt), client, model=OPENROUTER_MODEL_REPORT),
+    )
+    result = {**greeting, **first_question}
+    if "greeting" in result:
+        greeting_text = fill_name_placeholder(str(result["greeting"]), req.name)
+        if greeting_text is None:
+            # Fall back to the stock greeting below rather than speak a placeholder
+            del result["greeting"]
+        else:
+            result["greeting"] = greeting_text
+
+    await sessions.set(session_id, {
         "name": req.name,
         "roleTitle": req.roleTitle,
         "roleDesc": req.roleDesc,
         "intensity": req.intensity,
         "roleBucket": role_bucket,
         "questions": [result.get("firstQuestion", "Tell me about a time you faced a challenge at work.")],
-    }
+    })
 
     return SessionStartResponse(
         sessionId=session_id,
@@ -249,15 +987,12 @@ Respond ONLY with valid JSON in this format:
     )
 
 
-@app.post("/turn/next", response_model=TurnNextResponse)
-async def turn_next(req: TurnNextRequest):
-    persona = get_intensity_persona(req.intensity)
-
-    conversation_history = "\n".join([
-        f"{'Interviewer' if t.type == 'ai' else 'Candidate'}: {t.aiText if t.type == 'ai' else t.userTranscript}"
-        for t in req.turnsSoFar
-    ])
-
+@app.post("/turn/next", response_model=TurnNextResponse, openapi_extra=json_body_openapi(TurnNextRequest))
+async def turn_next(
+    req: TurnNextRequest = Depends(json_body(TurnNextRequest)),
+    client: httpx.AsyncClient = Depends(get_openrouter_client),
+    sessions: SessionStore = Depends(get_session_store),
+):
     # NOTE: Per-turn evaluation commented out for performance optimization.
     # The evaluation was not being used - follow-up decisions are made by a separate LLM call,
     # and the final report does its own comprehensive analysis.
@@ -298,239 +1033,164 @@ async def turn_next(req: TurnNextRequest):
     #     notes=eval_result.get("notes", [])
     # )
 
-    # Placeholder evaluation (not used but required by response model)
-    internal_eval = InternalEval(
-        scores={"relevance": 0, "clarity": 0, "specificity": 0, "structure": 0, "confidenceMarkers": 0},
-        star={"S": "", "T": "", "A": "", "R": ""},
-        notes=[]
-    )
-
     # Check for repeat/rephrase request first (applies to any phase except greeting)
     if req.phase != "GREETING" and is_repeat_request(req.userTranscript):
-        # Generate a rephrased version of the question
-        rephrase_prompt = f"""You are interviewing for {req.roleTitle}.
-{persona}
-
-The candidate asked you to repeat or rephrase the question. The original question was:
-"{req.aiPromptedText}"
-
-Rephrase the question in a slightly different way to help the candidate understand. Keep the same intent but use different wording.
-
-IMPORTANT: Do NOT include any instructions or hints on how to answer the question.
-
-Respond ONLY with valid JSON:
-{{"aiText": "your rephrased question"}}"""
+        # Rephrasings of common questions are reused across candidates. Only CALM
+        # rephrasings are cached since they carry no pressure-specific wording, and
+        # only for the same role, since each was written under that role's system
+        # prompt. Follow-ups quote the candidate's answer, so they are never shared.
+        # Remaining risk: a main question may still carry a candidate-specific
+        # transition (e.g. their name), and at the similarity threshold a question
+        # differing in one key noun can match another's rephrasing.
+        embedding = None
+        partition = interviewer_system_prompt(req.intensity, req.roleTitle, req.roleDesc)
+        if req.intensity == "CALM" and req.phase != "FOLLOWUP":
+            embedding = await embed_text(req.aiPromptedText, client)
+            cached = await rephrase_cache.get(partition, embedding) if embedding is not None else None
+            # Never hand back the exact wording the candidate just asked us to repeat
+            if cached and cached != req.aiPromptedText:
+                return TurnNextResponse(
+                    action="REPEAT_QUESTION",
+                    aiText=cached,
+                    mainQuestionIndex=req.mainQuestionIndex,
+                    followupCount=req.followupCount
+                )
 
-        messages = [{"role": "user", "content": rephrase_prompt}]
-        result = await call_llm_json(messages)
+        # Generate a rephrased version of the question
+        rephrase_prompt = REPHRASE_TEMPLATE.format(question=req.aiPromptedText)
+        messages = interviewer_messages(req, rephrase_prompt)
+        result = await call_llm_json(messages, client, max_tokens=256)
+        if embedding is not None and result.get("aiText"):
+            await rephrase_cache.set(partition, embedding, result["aiText"])
 
         return TurnNextResponse(
             action="REPEAT_QUESTION",
             aiText=result.get("aiText", f"Of course. {req.aiPromptedText}"),
             mainQuestionIndex=req.mainQuestionIndex,
-            followupCount=req.followupCount,  # Don't change followup count
-            internalEval=internal_eval
+            followupCount=req.followupCount  # Don't change followup count
         )
 
+    # The history is only built on paths that put it in a prompt, so repeats and
+    # the END turn never start a summary nobody will read
     if req.phase == "GREETING":
-        next_prompt = f"""You are interviewing for {req.roleTitle}.
-{persona}
-
-The candidate just responded to your greeting. Now ask the first main behavioral question.
-Previous conversation:
-{conversation_history}
-
-IMPORTANT: Do NOT include any instructions or hints on how to answer the question. Just ask the question directly without telling the candidate to use STAR format, provide specific examples, or any other answering guidance.
-
-Generate a JSON response:
-{{"aiText": "your response transitioning to the first question", "action": "NEXT_MAIN"}}
-
-Stay in character. Do NOT give feedback on their greeting. Just naturally transition to asking the first behavioral question.
-Respond ONLY with valid JSON."""
-
-        messages = [{"role": "user", "content": next_prompt}]
-        result = await call_llm_json(messages)
+        conversation_history = await prompt_history(sessions, req.sessionId, req.turnsSoFar, client)
+        next_prompt = FIRST_TRANSITION_TEMPLATE.format(history=conversation_history)
+        messages = interviewer_messages(req, next_prompt)
+        result = await call_llm_json(messages, client)
 
         return TurnNextResponse(
             action="NEXT_MAIN",
             aiText=result.get("aiText", "Great, let's begin. " + req.turnsSoFar[0].aiText if req.turnsSoFar else "Let's begin with the first question."),
             mainQuestionIndex=0,
-            followupCount=0,
-            internalEval=internal_eval
+            followupCount=0
         )
 
     # End interview after 3rd main question has been answered (with any follow-ups)
     # We end when: mainQuestionIndex >= 2 AND (we've asked 2 follow-ups OR coming from followup phase)
     if req.mainQuestionIndex >= 2 and (req.followupCount >= 2 or req.phase == "FOLLOWUP"):
-        closing_prompt = f"""You are concluding a behavioral interview for {req.roleTitle}.
-{persona}
-
-Conversation so far:
-{conversation_history}
-
-Generate a brief, professional closing statement thanking the candidate. Do NOT give feedback or scores.
-
-Respond ONLY with valid JSON:
-{{"aiText": "your closing statement", "action": "END"}}"""
-
-        messages = [{"role": "user", "content": closing_prompt}]
-        result = await call_llm_json(messages)
-
         return TurnNextResponse(
             action="END",
-            aiText=result.get("aiText", "Thank you for your time today. We'll be in touch soon."),
+            aiText=random.choice(CLOSINGS.get(req.intensity, CLOSINGS["CALM"])),
             mainQuestionIndex=req.mainQuestionIndex,
-            followupCount=req.followupCount,
-            internalEval=internal_eval
+            followupCount=req.followupCount
         )
 
-    # Allow up to 2 follow-ups per main question
-    if req.phase == "MAIN" and req.followupCount < 2:
-        followup_prompt = f"""You are interviewing for {req.roleTitle}.
-{persona}
-
-Conversation so far:
-{conversation_history}
-
-The candidate just answered: {req.userTranscript}
+    conversation_history = await prompt_history(sessions, req.sessionId, req.turnsSoFar, client)
 
-Decide: should you ask a follow-up to dig deeper, or move to the next main question?
-- If the answer was vague, incomplete, or you want more specific details/examples, ask a follow-up
-- If the answer was sufficiently complete and detailed, move to the next main behavioral question
-- You can ask up to 2 follow-ups per main question if needed to get a complete picture
-
-IMPORTANT: Do NOT include any instructions or hints on how to answer the question. Just ask the question directly without telling the candidate to use STAR format, provide specific examples, or any other answering guidance.
-
-Respond ONLY with valid JSON:
-{{"action": "ASK_FOLLOWUP" or "NEXT_MAIN", "aiText": "your follow-up question OR your transition + next main question"}}
-
-Stay in character. Do NOT give feedback. Just ask questions naturally."""
-
-        messages = [{"role": "user", "content": followup_prompt}]
-        result = await call_llm_json(messages)
-
-        action = result.get("action", "NEXT_MAIN")
-        next_index = req.mainQuestionIndex if action == "ASK_FOLLOWUP" else req.mainQuestionIndex + 1
-        new_followup_count = req.followupCount + 1 if action == "ASK_FOLLOWUP" else 0
-
-        return TurnNextResponse(
-            action=action,
-            aiText=result.get("aiText", "Tell me more about that."),
-            mainQuestionIndex=next_index,
-            followupCount=new_followup_count,
-            internalEval=internal_eval
-        )
-
-    # After follow-ups are exhausted or coming from FOLLOWUP phase, check if we can ask another follow-up
-    # or need to move to the next main question
-    if req.phase == "FOLLOWUP" and req.followupCount < 2:
+    # Allow up to 2 follow-ups per main question. Whether the model asks another
+    # follow-up or moves on, the next main question is generated speculatively
+    # alongside the decision so moving on does not cost a second sequential round trip.
+    # One generated on an earlier turn for this main question is reused instead.
+    session = await sessions.get(req.sessionId) or {}
+    pending = session.get("pendingNextQuestion")
+    pending_question = (
+        pending["aiText"] if pending and pending["mainQuestionIndex"] == req.mainQuestionIndex else None
+    )
+    next_main_task = None
+    if req.phase == "MAIN" and req.followupCount < 2:
+        followup_prompt = FOLLOWUP_DECISION_TEMPLATE.format(history=conversation_history, answer=req.userTranscript)
+    elif req.phase == "FOLLOWUP" and req.followupCount < 2:
         # We're in follow-up phase but haven't exhausted follow-ups yet
-        followup_prompt = f"""You are interviewing for {req.roleTitle}.
-{persona}
-
-Conversation so far:
-{conversation_history}
-
-The candidate just answered your follow-up question: {req.userTranscript}
-
-Decide: do you need one more follow-up to get complete information, or is the answer now sufficient to move on?
-- If you still need more detail or clarity, ask ONE more follow-up
-- If the answer is now complete enough, move to the next main question
-
-IMPORTANT: Do NOT include any instructions or hints on how to answer the question.
-
-Respond ONLY with valid JSON:
-{{"action": "ASK_FOLLOWUP" or "NEXT_MAIN", "aiText": "your follow-up question OR transition + next main question"}}
-
-Stay in character. Do NOT give feedback."""
-
-        messages = [{"role": "user", "content": followup_prompt}]
-        result = await call_llm_json(messages)
+        followup_prompt = ANOTHER_FOLLOWUP_DECISION_TEMPLATE.format(history=conversation_history, answer=req.userTranscript)
+    else:
+        # Follow-ups exhausted: go straight to the next main question
+        followup_prompt = None
+
+    if followup_prompt is not None:
+        # A near-deterministic decision; only the follow-up itself needs any creativity
+        followup_task = asyncio.create_task(
+            call_llm_json(interviewer_messages(req, followup_prompt), client, temperature=0.2, max_tokens=256)
+        )
+        # On the last main question moving on rarely happens, so it is not worth speculating
+        if pending_question is None and req.mainQuestionIndex < 2:
+            next_main_task = asyncio.create_task(
+                call_llm_json(interviewer_messages(req, next_question_prompt(req, conversation_history)), client)
+            )
+        try:
+            result = await followup_task
+        except BaseException:
+            if next_main_task is not None:
+                discard_task(next_main_task)
+            raise
 
         action = result.get("action", "NEXT_MAIN")
         if action == "ASK_FOLLOWUP":
+            if next_main_task is not None:
+                run_in_background(
+                    keep_pending_next_question(sessions, req.sessionId, req.mainQuestionIndex, next_main_task)
+                )
             return TurnNextResponse(
                 action=action,
                 aiText=result.get("aiText", "Tell me more about that."),
                 mainQuestionIndex=req.mainQuestionIndex,
-                followupCount=req.followupCount + 1,
-                internalEval=internal_eval
+                followupCount=req.followupCount + 1
             )
         # Fall through to next main question if NEXT_MAIN
 
-    next_q_prompt = f"""You are interviewing for {req.roleTitle}.
-{persona}
-
-Conversation so far:
-{conversation_history}
-
-Generate the next main behavioral question (question #{req.mainQuestionIndex + 2} of 3).
-Make it relevant to the role and different from previous questions.
-
-IMPORTANT: Do NOT include any instructions or hints on how to answer the question. Just ask the question directly without telling the candidate to use STAR format, provide specific examples, or any other answering guidance.
-
-Respond ONLY with valid JSON:
-{{"action": "NEXT_MAIN", "aiText": "natural transition + your next behavioral question"}}
-
-Stay in character. Do NOT give feedback."""
-
-    messages = [{"role": "user", "content": next_q_prompt}]
-    result = await call_llm_json(messages)
+    if pending_question is not None:
+        result = {"aiText": pending_question}
+    elif next_main_task is not None:
+        result = await next_main_task
+    else:
+        messages = interviewer_messages(req, next_question_prompt(req, conversation_history))
+        result = await call_llm_json(messages, client)
 
     return TurnNextResponse(
         action="NEXT_MAIN",
         aiText=result.get("aiText", "Moving on, tell me about a time you worked on a team."),
         mainQuestionIndex=req.mainQuestionIndex + 1,
-        followupCount=0,  # Reset follow-up count for new main question
-        internalEval=internal_eval
+        followupCount=0  # Reset follow-up count for new main question
     )
 
 
-@app.post("/report/final", response_model=ReportFinalResponse)
-async def report_final(req: ReportFinalRequest):
-    conversation = "\n".join([
-        f"{'Interviewer' if t.type == 'ai' else 'Candidate'}: {t.aiText if t.type == 'ai' else t.userTranscript}"
-        for t in req.turns
-    ])
+@app.post("/report/final", response_model=ReportFinalResponse, openapi_extra=json_body_openapi(ReportFinalRequest))
+async def report_final(
+    req: ReportFinalRequest = Depends(json_body(ReportFinalRequest)),
+    client: httpx.AsyncClient = Depends(get_openrouter_client),
+    sessions: SessionStore = Depends(get_session_store),
+):
+    # Every turn but the closing one was already rendered by /turn/next
+    conversation = await conversation_transcript(sessions, req.sessionId, req.turns)
+    if not conversation:
+        raise HTTPException(status_code=422, detail="No interview turns to report on")
 
     repeat_info = ""
     if req.repeatRequestCount > 0:
         repeat_info = f"\nNote: The candidate asked for questions to be repeated or rephrased {req.repeatRequestCount} time(s) during the interview. Consider this in your assessment of their listening skills and ability to process questions under pressure."
 
-    prompt = f"""Analyze this complete behavioral interview and generate a detailed report.
-
-Candidate: {req.name}
-Role: {req.roleTitle}
-Role Description: {req.roleDesc}
-Experience Level: {req.roleBucket}
-Interview Intensity: {req.intensity}{repeat_info}
-
-Full Interview Transcript:
-{conversation}
-
-Generate a comprehensive JSON report:
-{{
-  "overallScore": 1-100,
-  "subscores": {{
-    "communication": 1-100,
-    "relevance": 1-100,
-    "structure": 1-100,
-    "specificity": 1-100,
-    "confidence": 1-100
-  }},
-  "strengths": ["strength 1", "strength 2", "strength 3"],
-  "improvements": ["area 1", "area 2", "area 3"],
-  "patternUnderPressure": "A paragraph describing how the candidate performed under pressure, their tendencies, and behavioral patterns observed",
-  "idealAnswerRewrite": "Take the weakest answer and rewrite it as an ideal STAR-formatted response",
-  "nextSteps": ["specific action item 1", "specific action item 2", "specific action item 3"]
-}}
-
-Be specific and constructive. Reference actual content from their answers.
-Respond ONLY with valid JSON."""
+    prompt = REPORT_TEMPLATE.format(
+        name=req.name,
+        role_title=req.roleTitle,
+        role_desc=req.roleDesc,
+        role_bucket=req.roleBucket,
+        intensity=req.intensity,
+        repeat_info=repeat_info,
+        conversation=conversation,
+    )
 
     messages = [{"role": "user", "content": prompt}]
     # Use higher quality model for final report analysis
-    result = await call_llm_json(messages, model=OPENROUTER_MODEL_REPORT)
+    result = await call_llm_json(messages, client, model=OPENROUTER_MODEL_REPORT, max_tokens=1500)
 
     return ReportFinalResponse(
         overallScore=result.get("overallScore", 70),
@@ -549,36 +1209,98 @@ Respond ONLY with valid JSON."""
     )
 
 
-@app.post("/tts")
-async def text_to_speech(req: TTSRequest):
-    if not ELEVENLABS_API_KEY:
-        raise HTTPException(status_code=500, detail="ELEVENLABS_API_KEY not configured")
-
-    voice_id = req.voice_id or ELEVENLABS_VOICE_ID
-
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(
-            f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}",
-            headers={
-                "xi-api-key": ELEVENLABS_API_KEY,
-                "Content-Type": "application/json",
-            },
-            json={
-                "text": req.text,
+def build_tts_request(client: httpx.AsyncClient, voice_id: str, text: str) -> httpx.Request:
+    return client.build_request(
+        "POST",
+        f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}/stream",
+        headers={
+            "xi-api-key": ELEVENLABS_API_KEY,
+            "Content-Type": "application/json",
+        },
+        content=orjson.dumps(
+            {
+                "text": text,
                 "model_id": "eleven_monolingual_v1",
                 "voice_settings": {
                     "stability": 0.5,
                     "similarity_boost": 0.5,
                 },
-            },
-        )
+            }
+        ),
+    )
 
+
+# Closings are the only AI lines fixed ahead of time; greetings and questions
+# are generated per session and rarely repeat
+RECURRING_TTS_TEXTS = frozenset(text for closings in CLOSINGS.values() for text in closings)
+
+
+async def prewarm_tts(client: httpx.AsyncClient, tts_cache: TTSCache) -> None:
+    # Workers boot together; the first to claim the job does it for all of them
+    if not await tts_cache.claim_prewarm():
+        return
+    for text in RECURRING_TTS_TEXTS:
+        if await tts_cache.get(ELEVENLABS_VOICE_ID, text) is not None:
+            continue
+        try:
+            response = await client.send(build_tts_request(client, ELEVENLABS_VOICE_ID, text))
+        except httpx.HTTPError:
+            return
         if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail="TTS generation failed")
+            return
+        await tts_cache.set(ELEVENLABS_VOICE_ID, text, response.content)
 
-        return Response(content=response.content, media_type="audio/mpeg")
+
+@app.post("/tts")
+async def text_to_speech(
+    req: TTSRequest,
+    client: httpx.AsyncClient = Depends(get_elevenlabs_client),
+    tts_cache: TTSCache = Depends(get_tts_cache),
+):
+    if not ELEVENLABS_API_KEY:
+        raise HTTPException(status_code=500, detail="ELEVENLABS_API_KEY not configured")
+
+    voice_id = req.voice_id or ELEVENLABS_VOICE_ID
+
+    cached = await tts_cache.get(voice_id, req.text)
+    if cached is not None:
+        return Response(content=cached, media_type="audio/mpeg")
+
+    response = await client.send(build_tts_request(client, voice_id, req.text), stream=True)
+    if response.status_code != 200:
+        await response.aclose()
+        raise HTTPException(status_code=response.status_code, detail="TTS generation failed")
+
+    # Pipe audio through as ElevenLabs produces it rather than buffering the whole MP3,
+    # keeping a copy to cache once the full clip has been received
+    async def audio_chunks():
+        chunks = []
+        try:
+            async for chunk in response.aiter_bytes(8192):
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            await response.aclose()
+        if req.text in RECURRING_TTS_TEXTS:
+            await tts_cache.set(voice_id, req.text, b"".join(chunks))
+        else:
+            await tts_cache.set(voice_id, req.text, b"".join(chunks), ttl=TTS_TRANSIENT_TTL_SECONDS)
+
+    return StreamingResponse(audio_chunks(), media_type="audio/mpeg")
 
 
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {"llm": llm_cache.stats(), "llmInflight": llm_inflight.stats(), "rephrase": rephrase_cache.stats()}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # "auto" picks uvloop and httptools when installed (uvloop is not available on Windows)
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8000")), loop="auto", http="auto")
@@ -0,0 +1,55 @@
+from typing import Optional
+
+import orjson
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from ttl_cache import TTLCache
+
+# Long enough to cover an interview plus the final report, even with pauses
+SESSION_TTL_SECONDS = 7200
+SESSION_LOCAL_MAXSIZE = 10000
+# How long a worker trusts its in-process copy of a Redis-backed session, which
+# bounds how stale a read can be after another worker updates it
+SESSION_LOCAL_TTL_SECONDS = 5.0
+
+
+class SessionStore:
+    """Interview session state. Kept in Redis when configured so every worker
+    sees the same sessions, with a small in-process LRU in front for hot reads.
+    Without Redis the in-process cache is the only copy.
+
+    Sessions only cache what clients resend in every request, so a Redis outage
+    degrades to misses and skipped writes rather than failing the request."""
+
+    def __init__(self, redis: Optional[Redis] = None, ttl: int = SESSION_TTL_SECONDS):
+        self.redis = redis
+        self.ttl = ttl
+        local_ttl = SESSION_LOCAL_TTL_SECONDS if redis is not None else ttl
+        self._local = TTLCache(maxsize=SESSION_LOCAL_MAXSIZE, ttl=local_ttl)
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"sess:{session_id}"
+
+    async def get(self, session_id: str) -> Optional[dict]:
+        session = await self._local.get(session_id)
+        if session is not None or self.redis is None:
+            return session
+        try:
+            raw = await self.redis.get(self._key(session_id))
+        except RedisError:
+            return None
+        if raw is None:
+            return None
+        session = orjson.loads(raw)
+        await self._local.set(session_id, session)
+        return session
+
+    async def set(self, session_id: str, session: dict) -> None:
+        if self.redis is not None:
+            try:
+                await self.redis.set(self._key(session_id), orjson.dumps(session), ex=self.ttl)
+            except RedisError:
+                pass
+        await self._local.set(session_id, session)
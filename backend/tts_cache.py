@@ -0,0 +1,61 @@
+import hashlib
+from typing import Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from ttl_cache import TTLCache
+
+# Recurring phrases (closings) are kept long term; anything else is only kept
+# briefly so a replay is free without filling Redis with one-off clips
+TTS_CACHE_TTL_SECONDS = 86400 * 30
+TTS_TRANSIENT_TTL_SECONDS = 600
+# Long enough for every worker booting together to see the first one's claim
+TTS_PREWARM_LOCK_SECONDS = 600
+TTS_LOCAL_MAXSIZE = 256
+
+
+class TTSCache:
+    """Synthesized MP3 audio keyed by (voice, text). Stored in Redis when
+    configured so all workers share it, with an in-process LRU in front. Redis
+    errors count as misses so an outage only costs a fresh synthesis."""
+
+    def __init__(self, redis: Optional[Redis] = None):
+        self.redis = redis
+        self._local = TTLCache(maxsize=TTS_LOCAL_MAXSIZE, ttl=TTS_CACHE_TTL_SECONDS)
+
+    @staticmethod
+    def _key(voice_id: str, text: str) -> str:
+        return f"tts:{voice_id}:{hashlib.sha256(text.encode()).hexdigest()}"
+
+    async def get(self, voice_id: str, text: str) -> Optional[bytes]:
+        key = self._key(voice_id, text)
+        audio = await self._local.get(key)
+        if audio is not None or self.redis is None:
+            return audio
+        try:
+            audio = await self.redis.get(key)
+        except RedisError:
+            return None
+        if audio is not None:
+            await self._local.set(key, audio)
+        return audio
+
+    async def set(self, voice_id: str, text: str, audio: bytes, ttl: int = TTS_CACHE_TTL_SECONDS) -> None:
+        key = self._key(voice_id, text)
+        if self.redis is not None:
+            try:
+                await self.redis.set(key, audio, ex=ttl)
+            except RedisError:
+                pass
+        await self._local.set(key, audio, ttl=ttl)
+
+    async def claim_prewarm(self) -> bool:
+        """True for the one worker that should synthesize the fixed phrases.
+        Without Redis nothing is shared, so no worker prewarms."""
+        if self.redis is None:
+            return False
+        try:
+            return bool(await self.redis.set("tts:prewarm", 1, nx=True, ex=TTS_PREWARM_LOCK_SECONDS))
+        except RedisError:
+            return False